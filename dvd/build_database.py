@@ -1,3 +1,4 @@
+import functools
 import json
 import multiprocessing
 import os
@@ -11,6 +12,8 @@ import dvd.config as config
 from dvd.func_call_shema import doc as D
 from dvd.utils import AzureOpenAIEmbeddingService, call_openai_model_with_tools
 
+VIDEO_DB_CACHE_SIZE = 8  # Parsed video databases kept in memory
+
 
 def frame_inspect_tool(
     database: A[NanoVectorDB, D("The database containing video metadata. Must be an instance of NanoVectorDB.")], 
@@ -237,8 +240,12 @@ def is_covered(d,N):
     i=sorted((int(a),int(b))for a,b in(map(lambda x:x.split('_'),d)));c=0
     return all(s==c and not (c:=e) for s,e in i) and c==N
 
+@functools.lru_cache(maxsize=VIDEO_DB_CACHE_SIZE)
+def _load_video_db(video_db_path, mtime_ns, emb_dim):
+    # mtime_ns is part of the cache key so a rebuilt database file is re-read
+    return NanoVectorDB(emb_dim, storage_file=video_db_path)
+
 def init_single_video_db(video_caption_json_path, output_video_db_path, emb_dim):
-    vdb = NanoVectorDB(emb_dim, storage_file=output_video_db_path)
     # with open(video_caption_json_path, "r") as f:
     #     captions = json.load(f)
     # subject_registry = captions.pop('subject_registry', captions.pop('character_registry', None))            
@@ -249,7 +256,10 @@ def init_single_video_db(video_caption_json_path, output_video_db_path, emb_dim)
     # video_length = convert_seconds_to_hhmmss(video_length)
     if os.path.exists(output_video_db_path):
         print(f"Database {output_video_db_path} already exists.")
+        # Parse each database file once and share the (read-only) instance across agents and their question threads
+        return _load_video_db(os.path.abspath(output_video_db_path), os.stat(output_video_db_path).st_mtime_ns, emb_dim)
     else:
+        vdb = NanoVectorDB(emb_dim, storage_file=output_video_db_path)
         cap2emb_list = preprocess_captions(video_caption_json_path)
         data = []
         for idx, (timestamp, cap, emb) in enumerate(cap2emb_list):
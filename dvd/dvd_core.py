@@ -34,10 +34,26 @@ class DVDCoreAgent:
             {"function": as_json_schema(func), "type": "function"}
             for func in self.name_to_function_map.values()
         ]
-        self.video_db = init_single_video_db(video_caption_path, video_db_path, config.AOAI_EMBEDDING_LARGE_DIM)
         self.max_iterations = max_iterations
+        self.load_database(video_db_path, video_caption_path)
+
+    def load_database(self, video_db_path, video_caption_path=None):
+        """
+        Point the agent at another video database, keeping the tools and schemas built in __init__.
+        Resets `self.messages` to the default prompt for the new video.
+        """
+        self.video_db = init_single_video_db(video_caption_path, video_db_path, config.AOAI_EMBEDDING_LARGE_DIM)
         self.messages = self._construct_messages()
 
+    def with_database(self, video_db_path, video_caption_path=None):
+        """
+        Return a shallow copy that shares tools and schemas with this agent but uses another video database,
+        so several videos can be served concurrently.
+        """
+        agent = copy.copy(self)
+        agent.load_database(video_db_path, video_caption_path)
+        return agent
+
     def _construct_messages(self):
         messages = [
             {
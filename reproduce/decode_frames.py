@@ -1,18 +1,55 @@
 import argparse
+import io
+import json
+import mmap
 import os
 import re
 import sys
 import tempfile
 import zipfile
 import shutil
+import struct
 import logging
+import queue
+import threading
+from fractions import Fraction
+from multiprocessing import resource_tracker, shared_memory
 from pathlib import Path
 from typing import List, Iterable
-import cv2
+import av
+import numpy as np
+import simplejpeg
 from tqdm import tqdm
 import multiprocessing as mp
-
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+JPEG_QUALITY = 95
+FRAMES_META_NAME = "frames_meta.json"  # Sidecar next to frames/ describing how they were extracted
+SAMPLE_BLOCK = 4096  # Sample schedule size when the container does not report a duration
+PBAR_STRIDE = 64  # Decoded frames per progress bar update
+CUDA_BATCH_SIZE = 32  # Frames decoded and JPEG-encoded per GPU batch
+CUDA_MAX_WORKERS = 2  # Decoder processes sharing the GPU; each holds its own CUDA context, NVDEC session and nvJPEG state
+RING_SLOTS = 4  # Raw frames buffered in shared memory between the decoder and its encoder process
+RING_QUEUE_SIZE = 16  # Frames (ring slots or encoded JPEGs) queued to the encoder process before the decoder blocks
+WRITE_WORKERS = 8  # Threads writing encoded frames to disk
+WRITE_MAX_PENDING = 64  # Max encoded frames buffered in memory before the encoder blocks
+MAX_TASKS_PER_CHILD = 8  # Videos decoded by a pool worker before it is replaced
+CRASH_RETRIES = 1  # Times a video lost to a crashed worker is decoded again before it is skipped
+PREFETCH_FACTOR = 2  # Extracted videos queued per decoder process
+COPY_CHUNK_SIZE = 4 << 20  # 4 MiB
+COPY_RANGE_SIZE = 1 << 30  # 1 GiB per copy_file_range call
+JPEG_PASSTHROUGH_CODECS = {"mjpeg"}  # Codecs whose packets are standalone JPEG images
+JPEG_DHT_MARKER = 0xC4  # Define Huffman Table
+JPEG_SOS_MARKER = 0xDA  # Start of Scan, entropy-coded data follows
+ZIP_LOCAL_HEADER_SIZE = 30  # Fixed part of a zip local file header
 VIDEO_EXTS = {'.mp4', '.mov', '.avi', '.mkv', '.webm', '.flv', '.mpg', '.mpeg', '.m4v'}
+_decode_threads = 0  # FFmpeg decode threads per video, set by _init_worker in pool workers (0 = all cores)
+_frame_ring = None  # Per-process FrameRing, created by frame_ring()
+_RE_NUMBERED_PART = re.compile(r'(.+\.zip)\.(\d{3})$')
+_RE_WINZIP_PART = re.compile(r'(.+)\.z(\d{2})$', re.IGNORECASE)
 
 
 def find_all_parts(part_path: Path) -> List[Path]:
@@ -23,21 +60,27 @@ def find_all_parts(part_path: Path) -> List[Path]:
     name = part_path.name
     parent = part_path.parent
 
+    m = _RE_NUMBERED_PART.match(name)
+    m2 = _RE_WINZIP_PART.match(name)
+    if m or m2:
+        # One directory listing serves both naming schemes
+        with os.scandir(parent) as it:
+            names = sorted(e.name for e in it)
+
     # Match something like something.zip.001 or something.zip.002
-    m = re.match(r'(.+\.zip)\.(\d{3})$', name)
     if m:
         base = m.group(1)
-        parts = sorted(parent.glob(base + ".???"))
-        return parts
+        return [parent / n for n in names if (mm := _RE_NUMBERED_PART.match(n)) and mm.group(1) == base]
 
     # Match WinZip style: something.z01, something.z02 ... + something.zip
-    m2 = re.match(r'(.+)\.z(\d{2})$', name, re.IGNORECASE)
     if m2:
         base_prefix = m2.group(1)
-        zparts = sorted(parent.glob(base_prefix + ".z??"), key=lambda p: p.suffix.lower())
-        main_zip = parent / (base_prefix + ".zip")
-        if main_zip.exists():
-            return zparts + [main_zip]
+        zparts = sorted(
+            (n for n in names if (mm := _RE_WINZIP_PART.match(n)) and mm.group(1) == base_prefix),
+            key=lambda n: n[len(base_prefix):].lower(),
+        )
+        if base_prefix + ".zip" in names:
+            return [parent / n for n in zparts] + [parent / (base_prefix + ".zip")]
 
     # If it's a complete zip file
     if name.endswith(".zip"):
@@ -60,10 +103,27 @@ def assemble_zip(parts: List[Path]) -> Path:
         for p in parts:
             logging.info(f"Merging part: {p.name}")
             with open(p, "rb") as r:
-                shutil.copyfileobj(r, w, length=1024 * 1024)
+                copy_part(r, w)
     return Path(tmp_path)
 
 
+def copy_part(r, w):
+    """
+    Append the whole of file r to file w.
+    On Linux, os.copy_file_range copies inside the kernel without user-space buffers;
+    elsewhere (or if the filesystem refuses it) fall back to a buffered copy from the current offsets.
+    """
+    if hasattr(os, "copy_file_range"):
+        w.flush()
+        try:
+            while os.copy_file_range(r.fileno(), w.fileno(), COPY_RANGE_SIZE) > 0:
+                pass
+            return
+        except OSError as e:
+            logging.debug(f"copy_file_range unavailable ({e}), using buffered copy")
+    shutil.copyfileobj(r, w, length=1024 * 1024)
+
+
 def iter_video_members(zf: zipfile.ZipFile) -> Iterable[zipfile.ZipInfo]:
     for info in zf.infolist():
         if info.is_dir():
@@ -73,28 +133,484 @@ def iter_video_members(zf: zipfile.ZipFile) -> Iterable[zipfile.ZipInfo]:
             yield info
 
 
+def extract_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> Path:
+    """
+    Stream a zip member into a temporary file in fixed-size chunks and return its path.
+    Memory use stays at one chunk instead of the whole (possibly multi-GB) video.
+    """
+    suffix = Path(info.filename).suffix
+    with zf.open(info, 'r') as src, tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        try:
+            shutil.copyfileobj(src, tmp, length=COPY_CHUNK_SIZE)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+        return Path(tmp.name)
+
+
+class _SeekableMmap(mmap.mmap):
+    """mmap gains seekable() only in Python 3.13; zipfile needs it to open members."""
+
+    def seekable(self):
+        return True
+
+
+def open_archive(zip_path: Path) -> tuple[zipfile.ZipFile, mmap.mmap]:
+    """
+    Open a zip through a read-only mmap, so central-directory parsing and member reads are served
+    from the page cache instead of many small read() syscalls. Close the ZipFile before the mmap.
+    """
+    with open(zip_path, "rb") as f:
+        mm = _SeekableMmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return zipfile.ZipFile(mm, 'r'), mm
+    except BaseException:
+        mm.close()
+        raise
+
+
+def stored_member_span(mm: mmap.mmap, info: zipfile.ZipInfo) -> tuple[int, int] | None:
+    """
+    Return (offset, size) of an uncompressed, unencrypted member's bytes within the archive, or None otherwise.
+    The data starts after the local file header, whose name/extra lengths may differ from the central directory.
+    """
+    if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+        return None
+    header = mm[info.header_offset:info.header_offset + ZIP_LOCAL_HEADER_SIZE]
+    if header[:4] != b"PK\x03\x04":
+        return None
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    return info.header_offset + ZIP_LOCAL_HEADER_SIZE + name_len + extra_len, info.file_size
+
+
+class MemberView(io.RawIOBase):
+    """Read-only, seekable window onto a span of a file, served from an mmap (lets PyAV decode a STORED member in place)."""
+
+    def __init__(self, path: Path, offset: int, size: int):
+        super().__init__()
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)[offset:offset + size]
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else min(self._pos + size, len(self._view))
+        data = bytes(self._view[self._pos:end])
+        self._pos = max(self._pos, end)
+        return data
+
+    def readinto(self, b) -> int:
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            pos += self._pos
+        elif whence == io.SEEK_END:
+            pos += len(self._view)
+        self._pos = max(0, pos)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+            self._mm.close()
+        super().close()
+
+
 def ensure_dir(path: Path):
     path.mkdir(parents=True, exist_ok=True)
 
 
-def decode_video(temp_video_path: Path, out_root: Path, fps: float, overwrite: bool = False, video_stem: str | None = None):
+def last_frame_index(frames_dir: Path) -> int:
+    """Return the highest N among existing frames_nNNNNNN.jpg files (0 if none), using a single directory scan."""
+    with os.scandir(frames_dir) as it:
+        return max(
+            (int(e.name[8:-4]) for e in it
+             if e.name.startswith("frames_n") and e.name.endswith(".jpg") and e.name[8:-4].isdigit()),
+            default=0,
+        )
+
+
+def encode_jpeg(frame) -> bytes:
+    """
+    Encode a BGR frame to JPEG with libjpeg-turbo (SIMD DCT/Huffman), without intermediate copies.
+    Chroma is subsampled 4:2:0 like cv2.imwrite; simplejpeg's 4:4:4 default is slower and larger.
+    """
+    return simplejpeg.encode_jpeg(frame, quality=JPEG_QUALITY, colorspace="BGR", colorsubsampling="420", fastdct=True)
+
+
+class FrameWriter:
+    """
+    Write encoded JPEGs from a small thread pool (write() releases the GIL), so per-file
+    open/write/close latency overlaps instead of serializing behind the encoder.
+    Names are resolved against an open directory fd where supported, and the number of
+    encoded frames waiting to be written is capped to bound memory.
+    """
+
+    def __init__(self, frames_dir: Path, max_workers: int = WRITE_WORKERS, max_pending: int = WRITE_MAX_PENDING):
+        self.frames_dir = frames_dir
+        self.dir_fd = os.open(frames_dir, os.O_RDONLY) if os.open in os.supports_dir_fd else None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(self, name: str, data: bytes):
+        self._slots.acquire()
+        future = self._executor.submit(self._write, name, data)
+        future.add_done_callback(lambda _: self._slots.release())
+
+    def _write(self, name: str, data: bytes):
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+        try:
+            if self.dir_fd is not None:
+                fd = os.open(name, flags, 0o644, dir_fd=self.dir_fd)
+            else:
+                fd = os.open(self.frames_dir / name, flags, 0o644)
+            with open(fd, "wb") as f:
+                f.write(data)
+        except Exception as e:
+            logging.error(f"Failed to write frame {self.frames_dir / name}: {e}")
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self.dir_fd is not None:
+            os.close(self.dir_fd)
+            self.dir_fd = None
+
+
+def _encode_process(slots: int, free_slots, filled, done):
+    """
+    Encoder side of a FrameRing, serving one video after another until a None sentinel arrives.
+    ("video", frames_dir, shm_name, shape) starts a video; (slot, file_name, jpeg_bytes) items carry its frames,
+    read straight out of shared memory (jpeg_bytes is set instead of slot for already-encoded frames);
+    ("end",) waits for the video's writes to finish and acknowledges on done.
+    Exits early if the decoding process goes away.
+    """
+    shm = ring = writer = None
+    parent = mp.parent_process()
+
+    def next_item():
+        # Also stop if the decoding process dies (e.g. a terminated pool worker), instead of lingering as an orphan
+        while True:
+            try:
+                return filled.get(timeout=1)
+            except queue.Empty:
+                if not parent.is_alive():
+                    return None
+
+    try:
+        while (item := next_item()) is not None:
+            if item[0] == "video":
+                _, frames_dir, shm_name, shape = item
+                if shm is None or shm.name != shm_name:
+                    # The producer grew its buffer; the old one is no longer referenced by queued items
+                    ring = None
+                    if shm is not None:
+                        shm.close()
+                    shm = shared_memory.SharedMemory(name=shm_name)
+                ring = np.ndarray((slots, *shape), dtype=np.uint8, buffer=shm.buf)
+                writer = FrameWriter(frames_dir)
+                continue
+            if item[0] == "end":
+                writer.close()
+                writer = None
+                done.release()
+                continue
+            slot, name, data = item
+            try:
+                if data is None:
+                    data = encode_jpeg(ring[slot])
+            except Exception as e:
+                logging.error(f"Failed to encode frame {name}: {e}")
+                continue
+            finally:
+                if slot is not None:
+                    free_slots.release()
+            writer.submit(name, data)
+    finally:
+        if writer is not None:
+            writer.close()
+        ring = None
+        if shm is not None:
+            shm.close()
+
+
+class FrameRing:
+    """
+    Ring of raw BGR frame slots in shared memory, drained by a dedicated JPEG encoder process.
+    Only small (slot, file_name) tuples travel through the queue, so frames are never pickled,
+    and JPEG encoding runs outside the decoding process's GIL.
+    Slots are consumed in FIFO order by a single encoder, so the producer can hand them out round-robin.
+    The queue is bounded too, so already-encoded frames (MJPEG passthrough) cannot pile up in memory.
+    One ring serves all videos decoded by a process; see frame_ring().
+    """
+
+    def __init__(self, slots: int = RING_SLOTS, queue_size: int = RING_QUEUE_SIZE):
+        self.shape = None
+        self.slots = slots
+        self.shm = None
+        self._ring = None
+        self._free = mp.Semaphore(slots)
+        self._filled = mp.Queue(maxsize=queue_size)
+        self._done = mp.Semaphore(0)
+        self._next_slot = 0
+        # The encoder must share this process's resource tracker; one of its own would report our segments as leaked
+        resource_tracker.ensure_running()
+        self.encoder = mp.Process(
+            target=_encode_process,
+            args=(slots, self._free, self._filled, self._done),
+            daemon=True,
+        )
+        self.encoder.start()
+
+    def _check_encoder(self):
+        if not self.encoder.is_alive():
+            raise RuntimeError(f"Encoder process exited with code {self.encoder.exitcode}")
+
+    def _put(self, item):
+        while True:
+            try:
+                self._filled.put(item, timeout=1)
+                return
+            except queue.Full:
+                self._check_encoder()
+
+    def _release_shm(self):
+        self._ring = None
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def start_video(self, frames_dir: Path, shape: tuple):
+        """Direct the following frames (of the given shape) to frames_dir, growing the shared buffer if needed."""
+        size = max(int(np.prod(shape)) * self.slots, 1)
+        if self.shm is None or self.shm.size < size:
+            self._release_shm()
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.shape = shape
+        self._ring = np.ndarray((self.slots, *shape), dtype=np.uint8, buffer=self.shm.buf)
+        self._put(("video", frames_dir, self.shm.name, shape))
+
+    def end_video(self):
+        """Block until every frame of the current video has been encoded and written."""
+        self._put(("end",))
+        while not self._done.acquire(timeout=1):
+            self._check_encoder()
+
+    def put_frame(self, name: str, frame: np.ndarray):
+        if frame.shape != self.shape:
+            # Resolution changed mid-stream: encode here rather than resizing the ring
+            self.put_bytes(name, encode_jpeg(frame))
+            return
+        while not self._free.acquire(timeout=1):
+            self._check_encoder()
+        slot = self._next_slot
+        self._ring[slot] = frame
+        self._put((slot, name, None))
+        self._next_slot = (slot + 1) % self.slots
+
+    def put_bytes(self, name: str, data: bytes):
+        self._put((None, name, data))
+
+    def close(self):
+        if self.encoder.is_alive():
+            self._put(None)
+            self.encoder.join()
+        self._release_shm()
+
+
+def frame_ring() -> FrameRing:
+    """Return this process's FrameRing, starting its encoder process on first use and reusing it afterwards."""
+    global _frame_ring
+    if _frame_ring is not None and not _frame_ring.encoder.is_alive():
+        # The encoder died (e.g. killed); release its shared memory and start over rather than fail every later video
+        logging.warning(f"Encoder process exited with code {_frame_ring.encoder.exitcode}, starting a new one.")
+        _frame_ring.close()
+        _frame_ring = None
+    if _frame_ring is None:
+        _frame_ring = FrameRing()
+        # Runs on normal exit of pool workers too (atexit does not); the priority puts it ahead of
+        # multiprocessing's own queue finalizers so the sentinel can still be sent
+        mp.util.Finalize(None, _frame_ring.close, exitpriority=20)
+    return _frame_ring
+
+
+def sample_pts(step: Fraction, start: int, count: int) -> np.ndarray:
+    """Return ceil(k * step) for k in [start, start + count), computed exactly in integers."""
+    k = np.arange(start, start + count, dtype=np.int64)
+    return -((-k * step.numerator) // step.denominator)
+
+
+def scaled_size(width: int, height: int, max_side: int | None) -> tuple[int, int] | None:
+    """Return the (width, height) that fits the longer side within max_side, or None if no downscale is needed."""
+    if not max_side or max(width, height) <= max_side:
+        return None
+    scale = max_side / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def jpeg_has_huffman_tables(data) -> bool:
+    """
+    Return True if a JPEG image defines its own Huffman tables before its first scan.
+    Only the header segments are walked (each is skipped by its length), so a DHT inside an
+    APPn payload such as an EXIF thumbnail is not mistaken for one of the main image.
+    """
+    pos, end = 2, len(data)  # skip SOI
+    while pos + 4 <= end:
+        if data[pos] != 0xFF:
+            return False
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker == JPEG_DHT_MARKER:
+            return True
+        if marker == JPEG_SOS_MARKER:
+            return False
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # standalone markers carry no length
+            pos += 2
+            continue
+        pos += 2 + ((data[pos + 2] << 8) | data[pos + 3])
+    return False
+
+
+def _iter_frames(container, stream, passthrough: bool = True):
+    """
+    Yield the stream's pictures in presentation order as decoded frames.
+    For MJPEG streams every packet is already a complete JPEG image, so packets that carry their own
+    Huffman tables are yielded as-is and can be written without a decode/encode round trip.
+    Packets relying on the implicit default tables (MJPEG/AVI1 style) are decoded as usual.
+    passthrough=False always decodes (e.g. when frames must be resized).
+    """
+    if not passthrough or stream.codec_context.name not in JPEG_PASSTHROUGH_CODECS:
+        yield from container.decode(stream)
+        return
+    for packet in container.demux(stream):
+        if packet.size == 0:
+            continue
+        with memoryview(packet) as data:
+            self_contained = jpeg_has_huffman_tables(data)
+        if self_contained:
+            yield packet
+        else:
+            yield from stream.codec_context.decode(packet)
+    yield from stream.codec_context.decode(None)
+
+
+def _decode_video_cuda(video_path: Path, frames_dir: Path, fps: float, orig_fps: float, saved_index: int, video_stem: str,
+                       out_size: tuple[int, int] | None = None) -> int | None:
+    """
+    GPU path: NVDEC decoding via PyNvVideoCodec and nvJPEG encoding via torchvision.
+    Sampled frames stay on the device until they are compressed; only the JPEG bytes are copied back.
+    Returns the last saved frame index, or None if the CUDA stack is unavailable (caller falls back to CPU).
+    """
+    try:
+        import PyNvVideoCodec as nvc
+        import torch
+        from torchvision.io import encode_jpeg as nvjpeg_encode
+    except ImportError as e:
+        logging.warning(f"{video_stem}: CUDA backend unavailable ({e}), falling back to CPU decoding.")
+        return None
+    try:
+        decoder = nvc.SimpleDecoder(str(video_path), gpu_id=0, use_device_memory=True,
+                                    output_color_type=nvc.OutputColorType.RGB)
+    except Exception as e:
+        logging.warning(f"{video_stem}: NVDEC cannot open this video ({e}), falling back to CPU decoding.")
+        return None
+
+    # Same schedule as the CPU path, expressed in frame indices: ceil(k * orig_fps / fps)
+    total_frames = len(decoder)
+    step = Fraction(orig_fps).limit_denominator(1000) / Fraction(fps).limit_denominator(1000)
+    indices = sample_pts(step, 0, int(total_frames / step) + 2)
+    indices = np.unique(indices[indices < total_frames])
+
+    writer = FrameWriter(frames_dir)
+    try:
+        for i in tqdm(range(0, len(indices), CUDA_BATCH_SIZE), desc=f"Decoding {video_stem} (cuda)", unit="batch", dynamic_ncols=True):
+            frames = decoder.get_batch_frames_by_index(indices[i:i + CUDA_BATCH_SIZE].tolist())
+            tensors = [torch.from_dlpack(f).permute(2, 0, 1).contiguous() for f in frames]  # HWC -> CHW
+            if out_size:
+                tensors = [
+                    torch.nn.functional.interpolate(t[None].float(), size=out_size[::-1], mode="area")[0]
+                    .round_().clamp_(0, 255).to(torch.uint8)
+                    for t in tensors
+                ]
+            for data in nvjpeg_encode(tensors, quality=JPEG_QUALITY):
+                saved_index += 1
+                writer.submit(f"frames_n{saved_index:06d}.jpg", data.cpu().numpy().tobytes())
+    finally:
+        writer.close()
+    return saved_index
+
+
+def cuda_backend_available() -> bool:
+    """Return True if the GPU path's libraries import and a CUDA device is visible (probed once, before sizing the pool)."""
+    try:
+        import PyNvVideoCodec  # noqa: F401
+        import torch
+        import torchvision.io  # noqa: F401
+    except ImportError as e:
+        logging.warning(f"CUDA backend unavailable ({e}), using CPU decoding.")
+        return False
+    if not torch.cuda.is_available():
+        logging.warning("CUDA backend unavailable (no CUDA device), using CPU decoding.")
+        return False
+    return True
+
+
+def decode_video(temp_video_path: Path, out_root: Path, fps: float, overwrite: bool = False, video_stem: str | None = None,
+                 backend: str = "cpu", member: tuple[int, int] | None = None, max_side: int | None = None):
     """
     Extract frames at the given fps and save them.
     video_stem: Pass the original video filename (without extension) to avoid using the temporary filename.
+    member: (offset, size) of a STORED video inside temp_video_path (an archive), decoded in place without extraction.
+    backend: "cpu" decodes inside FFmpeg (via PyAV) with frame threading; only the sampled frames are converted to ndarrays.
+             "cuda" decodes and JPEG-encodes on the GPU when PyNvVideoCodec and torchvision are installed.
+    max_side: Downscale frames (area interpolation) so the longer side is at most this many pixels before encoding.
     """
-    cap = cv2.VideoCapture(str(temp_video_path))
-    if not cap.isOpened():
-        logging.error(f"Cannot open video: {temp_video_path}")
+    source = MemberView(temp_video_path, *member) if member else None
+    try:
+        container = av.open(source or str(temp_video_path))
+    except av.error.FFmpegError as e:
+        logging.error(f"Cannot open video: {video_stem or temp_video_path} ({e})")
+        if source:
+            source.close()
         return
 
-    orig_fps = cap.get(cv2.CAP_PROP_FPS) or 0
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    stream = container.streams.video[0]
+    stream.thread_type = "AUTO"
+    stream.codec_context.thread_count = _decode_threads or os.cpu_count() or 1
+
+    orig_fps = float(stream.average_rate or 0)
+    total_frames = stream.frames or 0
     if orig_fps <= 0:
         logging.warning(f"Original FPS abnormal ({orig_fps}), will estimate by frame time.")
         orig_fps = fps  # fallback
 
-    interval = 1.0 / fps
-    next_t = 0.0
+    # Precompute the pts offsets (relative to the first frame) at which each output frame is due;
+    # the loop then only compares integers, with no float drift over long videos.
+    time_base = stream.time_base or Fraction(1, av.time_base)
+    step = 1 / (Fraction(fps).limit_denominator(1000) * time_base)  # pts units between samples
+    if stream.duration:
+        duration = stream.duration
+    elif container.duration:
+        duration = container.duration * Fraction(1, av.time_base) / time_base
+    else:
+        duration = 0
+    keep_pts = sample_pts(step, 0, int(duration / step) + 2 if duration else SAMPLE_BLOCK).tolist()
+    next_keep = 0
+    next_due = None  # absolute pts of the next frame to keep, set from the first frame
     frame_index = 0
     saved_index = 0
 
@@ -105,79 +621,248 @@ def decode_video(temp_video_path: Path, out_root: Path, fps: float, overwrite: b
 
     if not overwrite:
         # Count existing frames, auto-continue
-        existing = sorted(frames_dir.glob("frames_n*.jpg"))
-        if existing:
-            last = existing[-1].stem
-            m = re.search(r'frames_n(\d+)', last)
-            if m:
-                saved_index = int(m.group(1))
-                logging.info(f"{video_stem}: Append mode, {saved_index} frames already exist.")
+        saved_index = last_frame_index(frames_dir)
+        if saved_index:
+            logging.info(f"{video_stem}: Append mode, {saved_index} frames already exist.")
+
+    width, height = stream.codec_context.width, stream.codec_context.height
+    out_size = scaled_size(width, height, max_side)
+    out_width, out_height = out_size or (width, height)
+    # Record how frames were produced so consumers can skip their own resize
+    meta_path = frames_dir.parent / FRAMES_META_NAME
+    if not saved_index:
+        with open(meta_path, "w") as f:
+            json.dump({"fps": fps, "max_side": max_side, "width": out_width, "height": out_height}, f)
+    elif meta_path.exists():
+        # Appending: the sidecar describes the existing frames, so new ones must be extracted the same way
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if (meta.get("fps"), meta.get("max_side")) != (fps, max_side):
+            logging.error(f"{video_stem}: Existing frames were extracted with fps={meta.get('fps')}, "
+                          f"max_side={meta.get('max_side')}; use --overwrite to re-extract with different settings.")
+            container.close()
+            if source:
+                source.close()
+            return
+
+    if backend == "cuda":
+        try:
+            cuda_saved_index = _decode_video_cuda(temp_video_path, frames_dir, fps, orig_fps, saved_index, video_stem, out_size)
+        except BaseException:
+            container.close()
+            if source:
+                source.close()
+            raise
+        if cuda_saved_index is not None:
+            container.close()
+            if source:
+                source.close()
+            logging.info(f"{video_stem}: Frame extraction complete, total (including existing) {cuda_saved_index} frames.")
+            return
     
     pbar = tqdm(total=total_frames if total_frames > 0 else None,
                 desc=f"Decoding {video_stem}",
                 unit="f",
                 dynamic_ncols=True)
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        current_t = frame_index / orig_fps
-        if current_t + 1e-6 >= next_t:
-            saved_index += 1
-            out_path = frames_dir / f"frames_n{saved_index:06d}.jpg"
-            if overwrite or not out_path.exists():
-                cv2.imwrite(str(out_path), frame, [int(cv2.IMWRITE_JPEG_QUALITY), 95])
-            next_t += interval
-        frame_index += 1
-        pbar.update(1)
-    pbar.close()
-    cap.release()
+    # Decode in this process, JPEG-encode + write in a paired encoder process fed through shared memory
+    ring = frame_ring()
+    ring.start_video(frames_dir, (out_height, out_width, 3))
+    # Resize happens inside swscale together with the BGR conversion
+    resize = {"width": out_width, "height": out_height, "interpolation": "AREA"} if out_size else {}
+
+    try:
+        for frame in _iter_frames(container, stream, passthrough=not out_size):
+            # Prefer the presentation timestamp; fall back to the frame counter for streams without pts
+            pts = frame.pts
+            if pts is None:
+                pts = round(frame_index / orig_fps / time_base)
+            if next_due is None:
+                start_pts = next_due = pts
+            # Skipped frames cost one integer compare; all schedule bookkeeping happens on kept frames only
+            if pts >= next_due:
+                saved_index += 1
+                # saved_index only grows past the last existing frame, so the target never exists in append mode
+                name = f"frames_n{saved_index:06d}.jpg"
+                if isinstance(frame, av.Packet):
+                    ring.put_bytes(name, bytes(frame))
+                else:
+                    ring.put_frame(name, frame.to_ndarray(format="bgr24", **resize))
+                next_keep += 1
+                if next_keep == len(keep_pts):
+                    # Container under-reported its duration, extend the schedule
+                    keep_pts.extend(sample_pts(step, len(keep_pts), len(keep_pts)).tolist())
+                next_due = start_pts + keep_pts[next_keep]
+            frame_index += 1
+            if frame_index % PBAR_STRIDE == 0:
+                pbar.update(PBAR_STRIDE)
+    except av.error.FFmpegError as e:
+        logging.error(f"{video_stem}: Decoding stopped early ({e})")
+    finally:
+        ring.end_video()
+        pbar.update(frame_index % PBAR_STRIDE)
+        pbar.close()
+        container.close()
+        if source:
+            source.close()
     logging.info(f"{video_stem}: Frame extraction complete, total (including existing) {saved_index} frames.")
 
 
-def process_archive(part_path: Path, out_root: Path, fps: float, overwrite: bool):
+def _init_worker(decode_threads: int, log_level: int):
+    """
+    Pool worker initializer: spawned workers do not inherit the parent's logging setup, and
+    FFmpeg decode threads are capped so workers do not oversubscribe the CPU.
+    """
+    global _decode_threads
+    _decode_threads = decode_threads
+    logging.basicConfig(level=log_level, format=LOG_FORMAT)
+
+
+def _prefetch_members(zf: zipfile.ZipFile, mm: mmap.mmap | None, members: List[zipfile.ZipInfo], out_queue: queue.Queue,
+                      stop: threading.Event):
+    """
+    Put (tmp_path, original_stem, member_span) on out_queue for each member in order, then a None sentinel.
+    STORED members are referenced in place when mm is given (member_span set, no temp file);
+    everything else is extracted to a temp file. Setting stop ends the listing early.
+    """
+    try:
+        for info in members:
+            if stop.is_set():
+                break
+            try:
+                span = stored_member_span(mm, info) if mm is not None else None
+                tmp_path = None if span else extract_member(zf, info)
+            except Exception as e:
+                # A corrupt member only costs that video
+                logging.error(f"Failed to extract {info.filename} from archive: {e}")
+                continue
+            out_queue.put((tmp_path, Path(info.filename).stem, span))
+    finally:
+        out_queue.put(None)
+
+
+def process_archive(part_path: Path, out_root: Path, fps: float, overwrite: bool, backend: str = "cpu",
+                    max_side: int | None = None):
+    if backend == "cuda" and not cuda_backend_available():
+        # Without the CUDA stack every video would fall back anyway; do so up front so the CPU worker count applies
+        backend = "cpu"
     parts = find_all_parts(part_path)
     logging.info("Found parts in order: " + ", ".join(p.name for p in parts))
     merged_zip = assemble_zip(parts)
     cleanup_needed = merged_zip not in parts  # If we generated a temporary file
     try:
-        with zipfile.ZipFile(merged_zip, 'r') as zf:
+        zf, mm = open_archive(merged_zip)
+        with mm, zf:
             video_members = list(iter_video_members(zf))
             logging.info(f"Number of video files in archive: {len(video_members)}")
-            temp_files = []  # (process, tmp_path)
-            max_workers = min(len(video_members), mp.cpu_count() or 1)
+            max_workers = max(1, min(len(video_members), mp.cpu_count() or 1))
+            if backend == "cuda":
+                max_workers = min(max_workers, CUDA_MAX_WORKERS)
             logging.info(f"Parallel decoding: using {max_workers} processes")
 
-            def wait_one():
-                # Wait for the earliest started process to finish and clean up temp file
-                proc, tpath = temp_files.pop(0)
-                proc.join()
+            pending = {}  # future -> ((tmp_path, original_stem, member_span), attempt)
+            retries = []  # (item, attempt) of videos lost to a crashed worker, to be decoded again
+
+            def remove_temp(tpath):
+                if tpath is None:
+                    return
                 try:
                     tpath.unlink(missing_ok=True)
                 except Exception:
                     pass
 
-            for info in video_members:
-                # Write this video to a temporary file
-                suffix = Path(info.filename).suffix
-                with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-                    tmp.write(zf.read(info))
-                    tmp_path = Path(tmp.name)
-
-                original_stem = Path(info.filename).stem
-                # Start a separate process for decoding, passing the original filename
-                p = mp.Process(target=decode_video, args=(tmp_path, out_root, fps), kwargs={'overwrite': overwrite, 'video_stem': original_stem})
-                p.start()
-                temp_files.append((p, tmp_path))
-
-                # If reached parallel limit, wait for the earliest one to finish
-                if len(temp_files) >= max_workers:
-                    wait_one()
-
-            # Wait for all remaining to finish
-            while temp_files:
-                wait_one()
+            def wait_some():
+                # Wait for at least one decode to finish and clean up its temp file
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    item, attempt = pending.pop(fut)
+                    tpath, stem, _ = item
+                    try:
+                        fut.result()
+                    except BrokenProcessPool:
+                        # A worker died (e.g. FFmpeg segfault or OOM kill); every video in flight on the pool is lost
+                        if attempt < CRASH_RETRIES:
+                            logging.warning(f"Worker process died while decoding {stem}, retrying it")
+                            retries.append((item, attempt + 1))
+                            continue
+                        logging.error(f"Decoding failed for {stem}: worker process died")
+                    except Exception as e:
+                        logging.error(f"Decoding failed for {stem}: {e}")
+                    remove_temp(tpath)
+
+            # Spawned (not forked) workers start with clean FFmpeg state and are recycled periodically to
+            # bound memory growth; each gets an even share of the cores for FFmpeg's decode threads.
+            pool_kwargs = {"max_tasks_per_child": MAX_TASKS_PER_CHILD} if sys.version_info >= (3, 11) else {}
+
+            def new_pool():
+                return ProcessPoolExecutor(max_workers=max_workers, mp_context=mp.get_context("spawn"),
+                                           initializer=_init_worker, initargs=(max(1, (mp.cpu_count() or 1) // max_workers), logging.getLogger().level),
+                                           **pool_kwargs)
+
+            executor = new_pool()
+
+            def submit(item, attempt):
+                nonlocal executor
+                tmp_path, original_stem, span = item
+                while True:
+                    try:
+                        # Decode in a pooled worker process, passing the original filename;
+                        # a retried video restarts from its first frame rather than appending to a partial run
+                        fut = executor.submit(decode_video, tmp_path or merged_zip, out_root, fps,
+                                              overwrite=overwrite or attempt > 0, video_stem=original_stem,
+                                              backend=backend, member=span, max_side=max_side)
+                        break
+                    except BrokenProcessPool:
+                        # Collect the decodes lost with the pool, then continue on a fresh one
+                        while pending:
+                            wait_some()
+                        executor.shutdown(wait=True)
+                        executor = new_pool()
+                pending[fut] = (item, attempt)
+
+                # If reached parallel limit, wait for one to finish (bounds temp disk usage)
+                if len(pending) >= max_workers:
+                    wait_some()
+
+            def run_retries():
+                # Rerun videos lost to a crashed worker one at a time, so one that crashes again only takes itself down
+                while pending:
+                    wait_some()
+                while retries:
+                    submit(*retries.pop(0))
+                    while pending:
+                        wait_some()
+
+            # Extract upcoming members on a background thread so the decoder pool is never left waiting on unzip;
+            # the bounded queue caps how many extracted temp files can pile up ahead of the decoders.
+            prefetched = queue.Queue(maxsize=max_workers * PREFETCH_FACTOR)
+            stop_prefetch = threading.Event()
+            prefetch_done = False
+            # STORED members are decoded straight out of the archive by the workers (the CUDA decoder needs a real file)
+            prefetcher = threading.Thread(target=_prefetch_members,
+                                          args=(zf, mm if backend == "cpu" else None, video_members, prefetched, stop_prefetch),
+                                          daemon=True)
+            prefetcher.start()
+
+            try:
+                while (item := prefetched.get()) is not None:
+                    submit(item, 0)
+                    if retries:
+                        run_retries()
+                prefetch_done = True
+
+                # Wait for all remaining to finish
+                run_retries()
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+                # On an early exit, stop extraction and remove temp files that were never decoded
+                stop_prefetch.set()
+                if not prefetch_done:
+                    while (item := prefetched.get()) is not None:
+                        remove_temp(item[0])
+                prefetcher.join()
+                for item, _ in [*pending.values(), *retries]:
+                    remove_temp(item[0])
     finally:
         if cleanup_needed:
             try:
@@ -192,6 +877,10 @@ def parse_args():
     ap.add_argument("--out", required=True, help="Output root directory")
     ap.add_argument("--fps", type=float, required=True, help="Target frame extraction rate (e.g. 5)")
     ap.add_argument("--overwrite", action="store_true", help="Overwrite existing frames")
+    ap.add_argument("--backend", default="cpu", choices=["cpu", "cuda"],
+                    help="cuda: NVDEC decode + nvJPEG encode (needs PyNvVideoCodec and torchvision), falls back to cpu")
+    ap.add_argument("--max-side", type=int, default=None,
+                    help="Downscale frames so the longer side is at most this many pixels (default: keep original size)")
     ap.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
     return ap.parse_args()
 
@@ -199,7 +888,7 @@ def main():
     args = parse_args()
     logging.basicConfig(
         level=getattr(logging, args.log_level),
-        format="%(asctime)s [%(levelname)s] %(message)s",
+        format=LOG_FORMAT,
     )
 
     part_path = Path(args.part).expanduser().resolve()
@@ -210,11 +899,16 @@ def main():
         logging.error("fps must be > 0")
         sys.exit(1)
 
+    if args.max_side is not None and args.max_side <= 0:
+        logging.error("max-side must be > 0")
+        sys.exit(1)
+
     if not part_path.exists():
         logging.error(f"File does not exist: {part_path}")
         sys.exit(1)
 
-    process_archive(part_path, out_root, args.fps, overwrite=args.overwrite)
+    process_archive(part_path, out_root, args.fps, overwrite=args.overwrite, backend=args.backend,
+                    max_side=args.max_side)
 
 
 if __name__ == "__main__":
@@ -1,13 +1,40 @@
 import os
-import json
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import argparse
 
+import orjson
+
+MAX_WORKERS = 8
+
+
+def _process_json(zip_ref, file_name, database_dir, zip_file_name):
+    """Rewrite 'video_file_root' of one JSON member and save it as <database_dir>/<zip>/<json>/database.json."""
+    # Read the JSON file (orjson parses bytes directly, no text decoding layer)
+    data = orjson.loads(zip_ref.read(file_name))
+
+    # Replace video_file_root
+    new_root = os.path.join(database_dir, zip_file_name)
+    data['video_file_root'] = new_root
+
+    # Create output directory
+    json_name = Path(file_name).stem
+    output_dir = os.path.join(database_dir, zip_file_name, json_name)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Save the JSON file
+    output_path = os.path.join(output_dir, 'database.json')
+    Path(output_path).write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+
+    print(f"Processed: {file_name} -> {output_path}")
+
+
 def replace_root_path(zip_file_path, database_dir):
     """
     Read a zip file, replace 'video_file_root' in JSON files, and save to the specified directory.
-    
+    JSON members are independent, so they are processed concurrently.
+
     Args:
         zip_file_path: Path to the zip file.
         database_dir: Directory for the database.
@@ -15,28 +42,14 @@ def replace_root_path(zip_file_path, database_dir):
     zip_file_name = Path(zip_file_path).stem
 
     with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
-        # Iterate through all files in the zip
-        for file_name in zip_ref.namelist():
-            if file_name.endswith('.json'):
-                # Read the JSON file
-                with zip_ref.open(file_name) as json_file:
-                    data = json.load(json_file)
-                
-                # Replace video_file_root
-                new_root = os.path.join(database_dir, zip_file_name)
-                data['video_file_root'] = new_root
-                
-                # Create output directory
-                json_name = Path(file_name).stem
-                output_dir = os.path.join(database_dir, zip_file_name, json_name)
-                os.makedirs(output_dir, exist_ok=True)
-                
-                # Save the JSON file
-                output_path = os.path.join(output_dir, 'database.json')
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-                
-                print(f"Processed: {file_name} -> {output_path}")
+        json_names = [name for name in zip_ref.namelist() if name.endswith('.json')]
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = [
+                executor.submit(_process_json, zip_ref, file_name, database_dir, zip_file_name)
+                for file_name in json_names
+            ]
+            for future in futures:
+                future.result()
 
 if __name__ == "__main__":
     # Example usage
@@ -2,15 +2,34 @@ import dvd.config as config
 import os
 import argparse
 import json
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+
+import orjson
 from dvd.dvd_core import DVDCoreAgent
 from dvd.video_utils import load_video, decode_video_to_frames, download_srt_subtitle
 from dvd.frame_caption import process_video, process_video_lite
 from dvd.utils import extract_answer
 
+MAX_WORKERS = 32  # Concurrent questions across all videos; bound by the LLM endpoint's rate limit
+PARTIAL_RESULTS_PATH = "benchmark_results.partial.jsonl"
+
+
+def run_question(agent, question):
+    try:
+        return agent.run(question)
+    except Exception as e:
+        print(f"Error processing question: {e}")
+        return None
+
+
 def main():
     parser = argparse.ArgumentParser(description="Run DVDCoreAgent on a video.")
     parser.add_argument("benchmark_database_folder", help="The path to the benchmark database folder.")
     parser.add_argument("benchmark_metadata", help="The path to the benchmark metadata file.")
+    parser.add_argument("--max-workers", type=int, default=MAX_WORKERS,
+                        help="Number of questions (across all videos) run concurrently.")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"Skip questions already answered in {PARTIAL_RESULTS_PATH} by an interrupted run.")
     args = parser.parse_args()
 
     benchmark_database_folder = args.benchmark_database_folder
@@ -18,40 +37,75 @@ def main():
     with open(args.benchmark_metadata, "r") as f:
         lines = f.readlines()
 
-    total_data = []
     results = {}
-    for line in lines:
-        # one line for one video instance containing multiple questions
-        video_info = json.loads(line)
-        video_id = video_info["key"]
-        qa_list = video_info["qa"]
-
-        qids = [qa["uid"] for qa in qa_list]
-        questions = [qa["question"] for qa in qa_list]
-
-        frames_dir = os.path.join(benchmark_database_folder, video_id, "frames")
-        if not os.path.exists(frames_dir) or len(os.listdir(frames_dir)) == 0:
-            print(f"Frames for video {frames_dir} not found, skipping...")
-            continue
-        video_db_path = os.path.join(benchmark_database_folder, video_id, "database.json")
-
-        print(f"Initializing DVDCoreAgent from database {video_db_path}...")
-        agent = DVDCoreAgent(video_db_path, video_caption_path=None, max_iterations=15)
-        agent.messages[-1]['content'] += "\nSelect the best option that accurately addresses the question.\nAnswer with the option\'s letter from the given choices directly and only give the best option."
-        print("Agent initialized.")
-        # Run with questions
-        msgs = agent.parallel_run(questions, max_workers=4)
-        for qid, question, msg in zip(qids, questions, msgs):
-            answer = extract_answer(msg[-1])
-            results[qid] = {
-                "question": question,
-                "answer": answer,
-                "reasoning": msg
-            }
+    # Resume from results written by an interrupted run
+    if args.resume and os.path.exists(PARTIAL_RESULTS_PATH):
+        with open(PARTIAL_RESULTS_PATH, "rb") as f:
+            for record in f:
+                results.update(orjson.loads(record))
+        print(f"Resuming, {len(results)} questions already answered.")
+
+    # Questions from all videos share one pool, so LLM calls overlap across videos rather than only within one.
+    # Submission is bounded, so only the databases of videos with in-flight questions are held in memory.
+    base_agent = None  # tools and schemas are built once; each video gets a shallow copy with its own database
+    pending = {}  # future -> (qid, question)
+    with ThreadPoolExecutor(max_workers=args.max_workers) as executor, open(PARTIAL_RESULTS_PATH, "ab" if args.resume else "wb") as partial:
+
+        def collect(return_when):
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                qid, question = pending.pop(future)
+                msg = future.result()
+                results[qid] = {
+                    "question": question,
+                    "answer": extract_answer(msg[-1]) if msg else None,
+                    "reasoning": msg
+                }
+                if msg is not None:  # failed questions are retried on the next run
+                    try:
+                        partial.write(orjson.dumps({qid: results[qid]}) + b"\n")
+                        partial.flush()
+                    except Exception as e:
+                        # The answer is still in results and goes into the final file
+                        print(f"Error saving partial result for {qid}: {e}")
+
+        for line in lines:
+            # one line for one video instance containing multiple questions
+            video_info = json.loads(line)
+            video_id = video_info["key"]
+            # uids are keyed as strings, as in the JSON files (and as read back on resume)
+            qa_list = [qa for qa in video_info["qa"] if str(qa["uid"]) not in results]
+            if not qa_list:
+                continue
+
+            frames_dir = os.path.join(benchmark_database_folder, video_id, "frames")
+            if not os.path.exists(frames_dir) or len(os.listdir(frames_dir)) == 0:
+                print(f"Frames for video {frames_dir} not found, skipping...")
+                continue
+            video_db_path = os.path.join(benchmark_database_folder, video_id, "database.json")
+
+            if base_agent is None:
+                print(f"Initializing DVDCoreAgent from database {video_db_path}...")
+                base_agent = agent = DVDCoreAgent(video_db_path, video_caption_path=None, max_iterations=15)
+            else:
+                print(f"Loading database {video_db_path}...")
+                agent = base_agent.with_database(video_db_path)
+            agent.messages[-1]['content'] += "\nSelect the best option that accurately addresses the question.\nAnswer with the option\'s letter from the given choices directly and only give the best option."
+            print("Agent initialized.")
+
+            for qa in qa_list:
+                pending[executor.submit(run_question, agent, qa["question"])] = (str(qa["uid"]), qa["question"])
+                if len(pending) >= 2 * args.max_workers:
+                    collect(FIRST_COMPLETED)
+        collect(ALL_COMPLETED)
 
     with open("benchmark_results.json", "w") as f:
         json.dump(results, f, ensure_ascii=False, indent=2)
 
+    if all(r["reasoning"] is not None for r in results.values()):
+        os.remove(PARTIAL_RESULTS_PATH)
+    else:
+        print(f"Some questions failed; rerun with --resume to retry them (answers kept in {PARTIAL_RESULTS_PATH}).")
+
 if __name__ == "__main__":
     main()
-